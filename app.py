@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
 import os
 import base64
 from datetime import datetime
@@ -8,11 +8,17 @@ from utils.script_generator import (
     analyze_script_content,
     generate_b_roll_suggestions,
     generate_thumbnail_suggestions,
-    get_available_templates
+    get_available_templates,
+    SCRIPT_TEMPLATES
 )
 from utils.seo_optimizer import optimize_content, analyze_seo_score
 from utils.export import generate_pdf, generate_docx
 from utils.text_to_speech import generate_speech
+from utils.model_router import get_routing_stats
+from utils.search_index import index_script_version, search_script_versions
+from utils.admission import AdmissionGate
+from utils.speculative import SpeculativeCache
+from utils.similarity import TopicSimilarityIndex
 
 load_dotenv()
 
@@ -22,6 +28,106 @@ app = Flask(__name__)
 # On Vercel (serverless) each cold start resets this dict.
 # For persistent versioning, replace with a database (e.g. Vercel KV / Postgres).
 script_versions = {}
+script_versions_by_id = {}
+
+# Admission control: each route class gets its own concurrency limit and
+# bounded wait queue, so slow upstream LLM/TTS calls cannot starve cheap
+# reads. Requests past the queue get a fast 503 with Retry-After.
+ROUTE_CLASS_LIMITS = {
+    # class: (concurrency, queue size, max wait seconds, max body bytes, retry-after seconds)
+    "read":   (32, 64, 2.0, 16 * 1024, 1),
+    "llm":    (8, 16, 15.0, 256 * 1024, 10),
+    "tts":    (4, 8, 15.0, 64 * 1024, 10),
+    "export": (4, 8, 10.0, 512 * 1024, 5),
+}
+
+ENDPOINT_ROUTE_CLASSES = {
+    "index": "read",
+    "static": "read",
+    "get_templates": "read",
+    "model_stats": "read",
+    "admission_stats": "read",
+    "precompute_stats": "read",
+    "get_script_versions": "read",
+    "get_script_version": "read",
+    "search_scripts": "read",
+    "script_endpoint": "llm",
+    "analyze_script_endpoint": "llm",
+    "b_roll_endpoint": "llm",
+    "thumbnails_endpoint": "llm",
+    "optimize_endpoint": "llm",
+    "seo_analysis_endpoint": "llm",
+    "speech_endpoint": "tts",
+    "export_pdf_endpoint": "export",
+    "export_docx_endpoint": "export",
+}
+
+admission_gates = {
+    name: AdmissionGate(concurrency, queue_size, timeout)
+    for name, (concurrency, queue_size, timeout, _, _) in ROUTE_CLASS_LIMITS.items()
+}
+
+# Opt-in speculative precompute: once a script is stored, analysis, B-roll
+# and thumbnails are computed in the background so the follow-up clicks are
+# served from the result. Jobs run inside the llm admission gate and only
+# take a slot that no request is waiting for.
+SPECULATIVE_PRECOMPUTE = os.getenv("SPECULATIVE_PRECOMPUTE", "false").lower() in ("1", "true", "yes")
+speculative = SpeculativeCache(admission_gates["llm"], max_workers=2, max_entries=96)
+
+# Near-duplicate topic detection: before generating, /generate-script looks
+# for a stored version with the same parameters and a similar topic.
+# "off" always generates, "offer" returns only the match so the UI can ask
+# (it resends with nearMatch "off" to generate anyway), "return" serves the
+# match's script.
+NEAR_MATCH_MODE = os.getenv("NEAR_MATCH_MODE", "off")
+NEAR_MATCH_THRESHOLD = float(os.getenv("NEAR_MATCH_THRESHOLD", "0.8"))
+topic_index = TopicSimilarityIndex()
+
+app.config["MAX_CONTENT_LENGTH"] = max(limits[3] for limits in ROUTE_CLASS_LIMITS.values())
+
+
+@app.before_request
+def admit_request():
+    route_class = ENDPOINT_ROUTE_CLASSES.get(request.endpoint)
+    if route_class is None:
+        return None
+    _, _, _, max_body, retry_after = ROUTE_CLASS_LIMITS[route_class]
+
+    # Checked up front so oversized payloads are rejected before queueing;
+    # the per-request limit also covers chunked bodies without a length.
+    request.max_content_length = max_body
+    if request.content_length is not None and request.content_length > max_body:
+        return jsonify({"error": f"Request body too large (limit {max_body} bytes)"}), 413
+
+    if not admission_gates[route_class].acquire():
+        response = jsonify({"error": "Server is busy, please retry shortly"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+    g.admission_class = route_class
+    return None
+
+
+@app.teardown_request
+def release_admission(exc):
+    route_class = g.pop("admission_class", None)
+    if route_class is not None:
+        admission_gates[route_class].release()
+
+
+def _parse_optional_bool(value):
+    """Accept None/"auto", JSON booleans, or "true"/"false" strings."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("", "auto"):
+            return None
+        if lowered in ("true", "1", "yes"):
+            return True
+        if lowered in ("false", "0", "no"):
+            return False
+    raise ValueError(f"Invalid boolean value: {value!r}")
 
 
 @app.route('/')
@@ -37,6 +143,21 @@ def get_templates():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/model-stats', methods=['GET'])
+def model_stats():
+    return jsonify(get_routing_stats())
+
+
+@app.route('/api/admission-stats', methods=['GET'])
+def admission_stats():
+    return jsonify({name: gate.stats() for name, gate in admission_gates.items()})
+
+
+@app.route('/api/precompute-stats', methods=['GET'])
+def precompute_stats():
+    return jsonify(speculative.stats())
+
+
 @app.route('/generate-script', methods=['POST'])
 def script_endpoint():
     data = request.json
@@ -46,10 +167,59 @@ def script_endpoint():
     target_audience = data.get('targetAudience', 'general')
     template_id = data.get('templateId', None)
     language = data.get('language', 'english')
+    optimize_for_seo = data.get('optimizeForSEO', False)
+    keywords = data.get('keywords', '')
+    near_match_mode = data.get('nearMatch', NEAR_MATCH_MODE)
 
     if not topic:
         return jsonify({"error": "Topic is required"}), 400
 
+    try:
+        duration = int(duration)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Duration must be a whole number of minutes"}), 400
+    if duration < 1:
+        return jsonify({"error": "Duration must be at least 1 minute"}), 400
+
+    try:
+        long_form = _parse_optional_bool(data.get('longForm', None))
+    except ValueError:
+        return jsonify({"error": "longForm must be true, false or omitted"}), 400
+    if long_form and template_id not in SCRIPT_TEMPLATES:
+        return jsonify({"error": "longForm requires a valid templateId"}), 400
+
+    try:
+        precompute = _parse_optional_bool(data.get('speculative', None))
+    except ValueError:
+        return jsonify({"error": "speculative must be true, false or omitted"}), 400
+    if precompute is None:
+        precompute = SPECULATIVE_PRECOMPUTE
+
+    params_key = (duration, tone, target_audience, template_id, language, long_form,
+                  bool(optimize_for_seo), keywords if optimize_for_seo else '')
+
+    if near_match_mode in ('offer', 'return'):
+        try:
+            threshold = float(data.get('nearMatchThreshold', NEAR_MATCH_THRESHOLD))
+        except (TypeError, ValueError):
+            threshold = None
+        if threshold is None or not 0 < threshold <= 1:
+            return jsonify({"error": "nearMatchThreshold must be a number between 0 and 1"}), 400
+
+        match = topic_index.query(topic, params_key, threshold)
+        if match is not None:
+            match_id, similarity = match
+            version = script_versions_by_id[match_id]
+            near_match = {
+                "script_id": match_id,
+                "topic": version["parameters"]["topic"],
+                "similarity": round(similarity, 3)
+            }
+            if near_match_mode == 'offer':
+                return jsonify({"near_match": near_match})
+            return jsonify({"script": version["script"], "script_id": match_id,
+                            "near_match": near_match})
+
     try:
         script = generate_video_script(
             topic=topic,
@@ -57,11 +227,12 @@ def script_endpoint():
             tone=tone,
             target_audience=target_audience,
             template_id=template_id,
-            language=language
+            language=language,
+            long_form=long_form,
+            gate=admission_gates["llm"]
         )
 
-        if data.get('optimizeForSEO', False):
-            keywords = data.get('keywords', '')
+        if optimize_for_seo:
             script = optimize_content(script, keywords)
 
         script_id = datetime.now().strftime('%Y%m%d%H%M%S')
@@ -69,7 +240,7 @@ def script_endpoint():
         if topic not in script_versions:
             script_versions[topic] = []
 
-        script_versions[topic].append({
+        version = {
             "id": script_id,
             "script": script,
             "timestamp": datetime.now().isoformat(),
@@ -81,7 +252,23 @@ def script_endpoint():
                 "template_id": template_id,
                 "language": language
             }
-        })
+        }
+        script_versions[topic].append(version)
+        script_versions_by_id.setdefault(script_id, version)
+        # Ids have one-second resolution; only a version that owns its id can
+        # be found by search or served back as a near match.
+        if script_versions_by_id[script_id] is version:
+            index_script_version(version)
+            topic_index.add(script_id, topic, params_key)
+
+        if precompute:
+            speculative.schedule(topic, script, {
+                "analysis": (lambda: analyze_script_content(script), None),
+                "b-roll": (lambda: generate_b_roll_suggestions(script), None),
+                "thumbnails": (lambda: generate_thumbnail_suggestions(topic, script), topic),
+            })
+        else:
+            speculative.invalidate(topic)
 
         return jsonify({"script": script, "script_id": script_id})
     except Exception as e:
@@ -95,7 +282,8 @@ def analyze_script_endpoint():
     if not script:
         return jsonify({"error": "Script content is required"}), 400
     try:
-        return jsonify(analyze_script_content(script))
+        return jsonify(speculative.get(
+            "analysis", script, lambda: analyze_script_content(script)))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -107,7 +295,8 @@ def b_roll_endpoint():
     if not script:
         return jsonify({"error": "Script content is required"}), 400
     try:
-        return jsonify(generate_b_roll_suggestions(script))
+        return jsonify(speculative.get(
+            "b-roll", script, lambda: generate_b_roll_suggestions(script)))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -120,7 +309,9 @@ def thumbnails_endpoint():
     if not topic or not script:
         return jsonify({"error": "Both topic and script are required"}), 400
     try:
-        return jsonify(generate_thumbnail_suggestions(topic, script))
+        return jsonify(speculative.get(
+            "thumbnails", script, lambda: generate_thumbnail_suggestions(topic, script),
+            topic=topic))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -167,11 +358,25 @@ def get_script_versions():
 
 @app.route('/script-version/<script_id>', methods=['GET'])
 def get_script_version(script_id):
-    for topic in script_versions:
-        for version in script_versions[topic]:
-            if version["id"] == script_id:
-                return jsonify(version)
-    return jsonify({"error": "Script version not found"}), 404
+    version = script_versions_by_id.get(script_id)
+    if version is None:
+        return jsonify({"error": "Script version not found"}), 404
+    return jsonify(version)
+
+
+@app.route('/search-scripts', methods=['GET'])
+def search_scripts():
+    try:
+        return jsonify(search_script_versions(
+            query=request.args.get('q', ''),
+            tone=request.args.get('tone') or None,
+            template_id=request.args.get('template') or None,
+            language=request.args.get('language') or None,
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 20, type=int)
+        ))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route('/export-pdf', methods=['POST'])
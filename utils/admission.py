@@ -0,0 +1,68 @@
+import time
+import threading
+
+
+class AdmissionGate:
+    """
+    Concurrency limit with a bounded wait queue for one class of routes.
+
+    Up to `concurrency` requests run at once and up to `queue_size` more wait
+    for a slot for at most `timeout` seconds. Anything beyond that is shed
+    immediately so callers can answer 503 instead of tying up a worker.
+    """
+
+    def __init__(self, concurrency, queue_size, timeout):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Return True once a slot is held, False if the request was shed."""
+        with self._cond:
+            if self.active < self.concurrency and not self.waiting:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                self.shed += 1
+                return False
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.timeout
+            try:
+                while self.active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def try_acquire(self):
+        """Take a free slot without queueing; never jumps ahead of waiters."""
+        with self._cond:
+            if self.active < self.concurrency and not self.waiting:
+                self.active += 1
+                return True
+            return False
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "shed": self.shed,
+                "concurrency": self.concurrency,
+                "queue_size": self.queue_size
+            }
@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+from collections import deque
+import openai
+
+# Models per task, cheapest/fastest first. The first healthy model wins;
+# the rest are failovers. Override with e.g.
+#   VIDIOFLOW_MODELS_THUMBNAILS=gpt-4o-mini,gpt-3.5-turbo
+TASK_PROFILES = {
+    "script":       {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "latency_budget": 60.0},
+    "b-roll":       {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "latency_budget": 20.0},
+    "analysis":     {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "latency_budget": 15.0},
+    "thumbnails":   {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "latency_budget": 15.0},
+    "seo-optimize": {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "latency_budget": 40.0},
+    "seo-analysis": {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "latency_budget": 20.0},
+    "meta-tags":    {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "latency_budget": 10.0},
+    "tts":          {"models": ["tts-1", "tts-1-hd"], "latency_budget": 30.0},
+}
+
+STATS_WINDOW = 20          # most recent calls kept per task and model
+MIN_SAMPLES = 4            # calls needed before a model can be judged degraded
+MAX_ERROR_RATE = 0.5
+DEGRADED_COOLDOWN = 60.0   # seconds a degraded model is skipped before retrying
+
+_lock = threading.Lock()
+_samples = {}              # (task, model) -> deque of (latency_seconds, ok)
+_degraded_until = {}       # (task, model) -> monotonic time
+_prompt_cache = {}         # task -> prompt token / cached token totals
+
+
+def get_models(task):
+    """Return the configured model list for a task, env override first."""
+    if task not in TASK_PROFILES:
+        raise ValueError(f"Unknown model routing task: '{task}'.")
+    override = os.getenv("VIDIOFLOW_MODELS_" + task.upper().replace("-", "_"))
+    if override:
+        models = [m.strip() for m in override.split(",") if m.strip()]
+        if not models:
+            raise ValueError(f"VIDIOFLOW_MODELS_{task.upper().replace('-', '_')} lists no models.")
+        return models
+    return list(TASK_PROFILES[task]["models"])
+
+
+def _is_transient(error):
+    """
+    Errors that say something about the model/provider rather than the
+    request: timeouts, connection failures, rate limits and 5xx responses.
+    """
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError,
+                          TimeoutError, ConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _stats(key):
+    samples = _samples.get(key, ())
+    if not samples:
+        return {"calls": 0, "error_rate": 0.0, "avg_latency": 0.0}
+    ok = [latency for latency, success in samples if success]
+    return {
+        "calls": len(samples),
+        "error_rate": 1 - len(ok) / len(samples),
+        "avg_latency": sum(ok) / len(ok) if ok else 0.0,
+    }
+
+
+def _record(model, task, latency, ok):
+    key = (task, model)
+    with _lock:
+        samples = _samples.setdefault(key, deque(maxlen=STATS_WINDOW))
+        samples.append((latency, ok))
+        stats = _stats(key)
+        budget = TASK_PROFILES[task]["latency_budget"]
+        if stats["calls"] >= MIN_SAMPLES and (
+                stats["error_rate"] > MAX_ERROR_RATE or stats["avg_latency"] > budget):
+            _degraded_until[key] = time.monotonic() + DEGRADED_COOLDOWN
+            # Start the model afresh once the cooldown has passed.
+            samples.clear()
+
+
+def _record_usage(task, response, prompt_version):
+    """Accumulate prompt and cached prompt tokens reported in response.usage."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    with _lock:
+        totals = _prompt_cache.setdefault(task, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "prompt_version": None
+        })
+        if totals["prompt_version"] != prompt_version:
+            # Numbers from an older prefix say nothing about the current one.
+            totals.update(calls=0, prompt_tokens=0, cached_tokens=0,
+                          prompt_version=prompt_version)
+        totals["calls"] += 1
+        totals["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        totals["cached_tokens"] += cached
+
+
+def _ordered_models(task):
+    """Healthy models in profile order, then degraded ones as a last resort."""
+    now = time.monotonic()
+    models = get_models(task)
+    with _lock:
+        healthy = [m for m in models if _degraded_until.get((task, m), 0) <= now]
+    return healthy + [m for m in models if m not in healthy]
+
+
+def route(task, call, prompt_version=None):
+    """
+    Run call(model) on the best model for the task, failing over to the next
+    one on transient errors. Latency and errors are recorded per task and
+    model, so a model that is slow or failing for this task is skipped for a
+    while. Errors caused by the request itself (bad input, content policy)
+    are re-raised straight away and don't count against the model.
+    Prompt-cache usage from the response is recorded against prompt_version.
+
+    Returns:
+        Whatever call returns for the first model that succeeds.
+    """
+    last_error = None
+    for model in _ordered_models(task):
+        start = time.monotonic()
+        try:
+            result = call(model)
+        except Exception as e:
+            if not _is_transient(e):
+                raise
+            _record(model, task, time.monotonic() - start, False)
+            last_error = e
+            continue
+        _record(model, task, time.monotonic() - start, True)
+        _record_usage(task, result, prompt_version)
+        return result
+    raise last_error
+
+
+def get_routing_stats():
+    """Snapshot of per-task model order, rolling model stats and prompt-cache usage."""
+    now = time.monotonic()
+    stats = {}
+    for task in TASK_PROFILES:
+        order = _ordered_models(task)
+        with _lock:
+            models = {
+                model: dict(_stats((task, model)),
+                            degraded=_degraded_until.get((task, model), 0) > now)
+                for model in order
+            }
+            cache = dict(_prompt_cache.get(task, {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "prompt_version": None
+            }))
+        cache["cached_ratio"] = (cache["cached_tokens"] / cache["prompt_tokens"]
+                                 if cache["prompt_tokens"] else 0.0)
+        stats[task] = {"order": order, "models": models, "prompt_cache": cache}
+    return stats
@@ -1,7 +1,10 @@
 import os
+import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
+from utils.model_router import route
 
 load_dotenv()
 
@@ -66,6 +69,104 @@ SCRIPT_TEMPLATES = {
 }
 
 
+WORDS_PER_MINUTE = 150
+
+# Above this many words a single completion runs into max_tokens, so scripts
+# with a known template structure are generated section by section instead.
+LONG_FORM_WORD_THRESHOLD = 1500
+LONG_FORM_MAX_WORKERS = 8
+
+# Prompts are laid out as a static prefix (system message with all fixed
+# instructions) followed by the variable payload in the user message.
+# OpenAI only caches prompts of 1024+ tokens, and every static prefix here
+# is well below that, so a call can only hit the cache when the whole prompt
+# prefix, payload included, repeats and exceeds 1024 tokens. In practice that
+# means re-running b-roll or analysis on the same long script. Script,
+# outline, section and thumbnail calls never reach it.
+# Each routing task has its own version; bump it when any of that task's
+# static prefixes changes, and its prompt-cache stats start afresh.
+PROMPT_VERSIONS = {
+    "script": "2",       # single-call, outline and long-form section prompts
+    "b-roll": "2",
+    "analysis": "2",
+    "thumbnails": "2",
+}
+
+SCRIPT_SYSTEM_PROMPT = """You are an expert video script writer who creates highly engaging, well-structured scripts with detailed visual guidance.
+
+Write the video script described in the user message, in the requested language, for the requested audience, tone and length.
+
+Format the script with clear SECTION HEADINGS.
+For each section, include:
+1. The main script content (what the presenter will say)
+2. [VISUAL NOTES] with specific B-roll and visual suggestions
+3. [CAPTION] suggestions for important text overlays
+
+At the end, provide 3 thumbnail suggestions with descriptions."""
+
+SCRIPT_DEFAULT_STRUCTURE = """The script should include:
+1. An engaging introduction that hooks the viewer
+2. Main content sections with key points about the topic
+3. A clear and concise conclusion with a call to action"""
+
+OUTLINE_SYSTEM_PROMPT = """You are an expert video script writer who plans well-structured scripts. Always respond with valid JSON matching the exact keys requested.
+
+Plan the video script described in the user message, following the template structure below.
+
+Return a JSON object with:
+- outline    : a list with one object per section, in order, each with the keys
+               section (the section name) and key_points (list of 2-4 short strings)
+- thumbnails : a list of 3 short thumbnail ideas with descriptions"""
+
+SECTION_SYSTEM_PROMPT = """You are an expert video script writer who creates highly engaging, well-structured scripts with detailed visual guidance.
+
+You are writing one section of a longer video script. The user message gives the script details, the full outline, and the one section to write.
+
+Write ONLY that section. Start with the section heading in capitals followed by a colon, on its own line.
+Include:
+1. The main script content (what the presenter will say)
+2. [VISUAL NOTES] with specific B-roll and visual suggestions
+3. [CAPTION] suggestions for important text overlays
+
+Do not write any other sections and do not add thumbnail suggestions."""
+
+B_ROLL_SYSTEM_PROMPT = """You are an expert video producer with deep knowledge of visual storytelling.
+
+Based on the video script in the user message, suggest the requested number of specific B-roll shots that would enhance the video.
+
+For each suggestion provide:
+1. description: A detailed description of the shot
+2. timing: When in the script it should appear
+3. purpose: What purpose it serves (illustrative, emotional, transitional, etc.)
+
+Return a JSON object with a single key "suggestions" whose value is a list of objects,
+each with the keys: description, timing, purpose."""
+
+ANALYSIS_SYSTEM_PROMPT = """You are an expert content analyst specializing in video scripts. Always respond with valid JSON matching the exact keys requested.
+
+Analyze the video script in the user message and return a JSON object with EXACTLY these keys:
+
+- readability_score  (integer 1-100)
+- reading_pace       (integer, words per minute)
+- tone_analysis      (string description)
+- complexity_level   (one of: beginner / intermediate / advanced)
+- word_count         (integer)
+- estimated_duration (string, e.g. "3 minutes 20 seconds")
+- key_strength       (string, one sentence)
+- top_suggestion     (string, one sentence improvement tip)"""
+
+THUMBNAILS_SYSTEM_PROMPT = """You are an expert in YouTube video marketing and thumbnail design.
+
+Suggest 3 compelling thumbnail ideas for the YouTube video described in the user message.
+
+Return a JSON object with a single key "thumbnails" whose value is a list of 3 objects.
+Each object must have these keys:
+- title        : short name for the thumbnail concept
+- description  : detailed visual description (composition, elements, colours)
+- text_overlay : short impactful text for the thumbnail (max 6 words)
+- appeal       : why this would attract viewers"""
+
+
 def _get_client():
     """Return an OpenAI client, raising clearly if the key is missing."""
     api_key = os.getenv("OPENAI_API_KEY")
@@ -86,92 +187,247 @@ def _extract_list(data: dict) -> list:
     return [data]
 
 
+def _template_prefix(system_prompt, template):
+    """Static prefix for a template: the task instructions plus its structure."""
+    structure = "\n".join(f"- {s['section']}: {s['desc']}" for s in template["structure"])
+    return f"{system_prompt}\n\nTemplate: {template['name']}\n\nStructure:\n{structure}"
+
+
+def _messages(static_prefix, payload):
+    return [
+        {"role": "system", "content": static_prefix},
+        {"role": "user", "content": payload}
+    ]
+
+
 def get_available_templates():
     return {tid: t["name"] for tid, t in SCRIPT_TEMPLATES.items()}
 
 
 def generate_video_script(topic, duration=5, tone="informative",
                           target_audience="general", template_id=None,
-                          language="english"):
-    client = _get_client()
-    word_count = duration * 150
+                          language="english", long_form=None, gate=None):
+    """
+    Generate a video script.
 
-    prompt = f"""
-Create a video script about '{topic}' in {language}.
+    long_form=None picks long-form mode automatically when a template is
+    selected and the target length would not fit a single completion;
+    True/False forces it on or off. Long-form mode needs a template.
+    gate is passed through to generate_long_form_script.
+    """
+    word_count = duration * WORDS_PER_MINUTE
 
-Target audience: {target_audience}
-Tone: {tone}
-Target length: Approximately {word_count} words ({duration} minutes)
-"""
-
-    if template_id and template_id in SCRIPT_TEMPLATES:
-        template = SCRIPT_TEMPLATES[template_id]
-        prompt += f"\nTemplate: {template['name']}\n\nStructure:"
-        for section in template["structure"]:
-            prompt += f"\n- {section['section']}: {section['desc']}"
-    else:
-        prompt += """
-The script should include:
-1. An engaging introduction that hooks the viewer
-2. Main content sections with key points about the topic
-3. A clear and concise conclusion with a call to action
-"""
+    if long_form and template_id not in SCRIPT_TEMPLATES:
+        raise ValueError("Long-form generation requires a valid template.")
 
-    prompt += """
+    if template_id in SCRIPT_TEMPLATES:
+        if long_form is None:
+            long_form = word_count > LONG_FORM_WORD_THRESHOLD
+        if long_form:
+            return generate_long_form_script(topic, duration, tone,
+                                             target_audience, template_id,
+                                             language, gate=gate)
 
-Format the script with clear SECTION HEADINGS.
-For each section, include:
-1. The main script content (what the presenter will say)
-2. [VISUAL NOTES] with specific B-roll and visual suggestions
-3. [CAPTION] suggestions for important text overlays
+    client = _get_client()
+
+    if template_id in SCRIPT_TEMPLATES:
+        static_prefix = _template_prefix(SCRIPT_SYSTEM_PROMPT, SCRIPT_TEMPLATES[template_id])
+    else:
+        static_prefix = f"{SCRIPT_SYSTEM_PROMPT}\n\n{SCRIPT_DEFAULT_STRUCTURE}"
 
-At the end, provide 3 thumbnail suggestions with descriptions.
-"""
+    payload = f"""Topic: {topic}
+Language: {language}
+Target audience: {target_audience}
+Tone: {tone}
+Target length: Approximately {word_count} words ({duration} minutes)"""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert video script writer who creates highly engaging, well-structured scripts with detailed visual guidance."},
-                {"role": "user", "content": prompt}
-            ],
+        response = route("script", lambda model: client.chat.completions.create(
+            model=model,
+            messages=_messages(static_prefix, payload),
             max_tokens=3000,
             temperature=0.7
-        )
+        ), prompt_version=PROMPT_VERSIONS["script"])
         return response.choices[0].message.content
     except Exception as e:
         raise Exception(f"Error generating script: {str(e)}")
 
 
-def generate_b_roll_suggestions(script, num_suggestions=5):
+def _section_word_budgets(structure, word_count):
+    """Split the total word count evenly across the template sections."""
+    base, remainder = divmod(word_count, len(structure))
+    return [base + (1 if i < remainder else 0) for i in range(len(structure))]
+
+
+def _script_details(topic, tone, target_audience, language):
+    return f"""Topic: {topic}
+Language: {language}
+Target audience: {target_audience}
+Tone: {tone}"""
+
+
+def _section_key(name):
+    """Normalize a section heading: no numbering, punctuation or case."""
+    return " ".join(re.findall(r"[a-z]+", str(name or "").lower()))
+
+
+def _as_points(value):
+    """Key points as a list of strings; a bare string is a single point."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    elif not isinstance(value, list):
+        value = [value]
+    return [str(p).strip() for p in value if str(p).strip()]
+
+
+def _plan_outline(client, topic, tone, target_audience, template, language):
+    """
+    Plan the whole script once so sections generated in parallel stay
+    coherent. Returns (key points per section, thumbnail ideas).
+    """
+    static_prefix = _template_prefix(OUTLINE_SYSTEM_PROMPT, template)
+    payload = _script_details(topic, tone, target_audience, language)
+
+    try:
+        response = route("script", lambda model: client.chat.completions.create(
+            model=model,
+            messages=_messages(static_prefix, payload),
+            max_tokens=1000,
+            temperature=0.7,
+            response_format={"type": "json_object"}
+        ), prompt_version=PROMPT_VERSIONS["script"])
+        data = json.loads(response.choices[0].message.content)
+    except Exception as e:
+        raise Exception(f"Error planning script outline: {str(e)}")
+
+    outline = [item for item in data.get("outline", []) if isinstance(item, dict)]
+    planned = {_section_key(item.get("section")): _as_points(item.get("key_points"))
+               for item in outline}
+    structure = template["structure"]
+    key_points = [planned.get(_section_key(s["section"])) for s in structure]
+    if len(outline) == len(structure):
+        # The model renamed or numbered some headings; the order still lines up.
+        key_points = [points if points is not None else _as_points(outline[i].get("key_points"))
+                      for i, points in enumerate(key_points)]
+    return [points or [] for points in key_points], data.get("thumbnails", [])
+
+
+def _generate_section(client, static_prefix, details, outline_text, section,
+                      key_points, word_budget):
+    points = "\n".join(f"- {p}" for p in key_points) or "- (use your judgement)"
+    # Everything up to the outline is shared by every section of the script,
+    # so only the tail differs between the parallel calls.
+    payload = f"""{details}
+
+Full outline of the script:
+{outline_text}
+
+Section to write: {section['section']} ({section['desc']})
+Key points to cover:
+{points}
+
+Target length: Approximately {word_budget} words."""
+
+    try:
+        response = route("script", lambda model: client.chat.completions.create(
+            model=model,
+            messages=_messages(static_prefix, payload),
+            # ~1.35 tokens per word plus room for the visual/caption notes
+            max_tokens=min(4000, int(word_budget * 1.6) + 300),
+            temperature=0.7
+        ), prompt_version=PROMPT_VERSIONS["script"])
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        raise Exception(f"Error generating section '{section['section']}': {str(e)}")
+
+
+def _format_thumbnail(idea):
+    """Plain text for a thumbnail idea the outline returned as text or an object."""
+    if not isinstance(idea, dict):
+        return str(idea)
+    title = idea.get("title") or idea.get("name")
+    details = [f"{key.replace('_', ' ').capitalize()}: {value}"
+               for key, value in idea.items()
+               if key not in ("title", "name") and value not in (None, "")]
+    return " - ".join(([str(title)] if title else []) + details)
+
+
+def generate_long_form_script(topic, duration=5, tone="informative",
+                              target_audience="general", template_id="tutorial",
+                              language="english", gate=None):
+    """
+    Generate a long script by planning the outline once, then writing every
+    template section concurrently with its own word budget. Wall-clock time
+    stays roughly flat as duration grows, and no single completion has to
+    hold the whole script.
+
+    The caller is assumed to hold one slot of `gate` (an AdmissionGate).
+    Parallel section calls beyond the first only run on extra slots that are
+    free right now, so the fan-out counts against the same upstream limit;
+    with no free slots the sections are written one after another.
+    """
+    if template_id not in SCRIPT_TEMPLATES:
+        raise ValueError(f"Long-form generation requires a template, got '{template_id}'.")
+
     client = _get_client()
+    template = SCRIPT_TEMPLATES[template_id]
+    structure = template["structure"]
+    budgets = _section_word_budgets(structure, duration * WORDS_PER_MINUTE)
+
+    key_points, thumbnails = _plan_outline(client, topic, tone, target_audience,
+                                           template, language)
+    outline_text = "\n".join(
+        f"{i + 1}. {s['section']}: " + "; ".join(points)
+        for i, (s, points) in enumerate(zip(structure, key_points))
+    )
+    static_prefix = _template_prefix(SECTION_SYSTEM_PROMPT, template)
+    details = _script_details(topic, tone, target_audience, language)
+
+    workers = min(LONG_FORM_MAX_WORKERS, len(structure))
+    borrowed = 0
+    if gate is not None:
+        while borrowed < workers - 1 and gate.try_acquire():
+            borrowed += 1
+        workers = 1 + borrowed
 
-    prompt = f"""
-Based on the following video script, suggest {num_suggestions} specific B-roll shots that would enhance the video.
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_generate_section, client, static_prefix, details,
+                            outline_text, structure[i], key_points[i], budgets[i])
+                for i in range(len(structure))
+            ]
+            sections = [f.result() for f in futures]
+    finally:
+        for _ in range(borrowed):
+            gate.release()
+
+    script = "\n\n".join(sections)
+    if thumbnails:
+        script += "\n\nTHUMBNAIL SUGGESTIONS:\n" + "\n".join(
+            f"{i + 1}. {_format_thumbnail(t)}" for i, t in enumerate(thumbnails)
+        )
+    return script
 
-For each suggestion provide:
-1. description: A detailed description of the shot
-2. timing: When in the script it should appear
-3. purpose: What purpose it serves (illustrative, emotional, transitional, etc.)
 
-Script:
-{script}
+def generate_b_roll_suggestions(script, num_suggestions=5):
+    client = _get_client()
 
-Return a JSON object with a single key "suggestions" whose value is a list of objects,
-each with the keys: description, timing, purpose.
-"""
+    payload = f"""Number of suggestions: {num_suggestions}
+
+Script:
+{script}"""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert video producer with deep knowledge of visual storytelling."},
-                {"role": "user", "content": prompt}
-            ],
+        response = route("b-roll", lambda model: client.chat.completions.create(
+            model=model,
+            messages=_messages(B_ROLL_SYSTEM_PROMPT, payload),
             max_tokens=1500,
             temperature=0.7,
             response_format={"type": "json_object"}
-        )
+        ), prompt_version=PROMPT_VERSIONS["b-roll"])
         data = json.loads(response.choices[0].message.content)
         return _extract_list(data)
     except Exception as e:
@@ -181,33 +437,17 @@ each with the keys: description, timing, purpose.
 def analyze_script_content(script):
     client = _get_client()
 
-    prompt = f"""
-Analyze the following video script and return a JSON object with EXACTLY these keys:
-
-- readability_score  (integer 1-100)
-- reading_pace       (integer, words per minute)
-- tone_analysis      (string description)
-- complexity_level   (one of: beginner / intermediate / advanced)
-- word_count         (integer)
-- estimated_duration (string, e.g. "3 minutes 20 seconds")
-- key_strength       (string, one sentence)
-- top_suggestion     (string, one sentence improvement tip)
-
-Script:
-{script}
-"""
+    payload = f"""Script:
+{script}"""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert content analyst specializing in video scripts. Always respond with valid JSON matching the exact keys requested."},
-                {"role": "user", "content": prompt}
-            ],
+        response = route("analysis", lambda model: client.chat.completions.create(
+            model=model,
+            messages=_messages(ANALYSIS_SYSTEM_PROMPT, payload),
             max_tokens=1000,
             temperature=0.3,
             response_format={"type": "json_object"}
-        )
+        ), prompt_version=PROMPT_VERSIONS["analysis"])
         return json.loads(response.choices[0].message.content)
     except Exception as e:
         raise Exception(f"Error analyzing script: {str(e)}")
@@ -217,31 +457,19 @@ def generate_thumbnail_suggestions(topic, script):
     client = _get_client()
     script_excerpt = script[:500] + "..." if len(script) > 500 else script
 
-    prompt = f"""
-Suggest 3 compelling thumbnail ideas for a YouTube video on this topic: "{topic}"
+    payload = f"""Topic: "{topic}"
 
 Script excerpt:
-{script_excerpt}
-
-Return a JSON object with a single key "thumbnails" whose value is a list of 3 objects.
-Each object must have these keys:
-- title        : short name for the thumbnail concept
-- description  : detailed visual description (composition, elements, colours)
-- text_overlay : short impactful text for the thumbnail (max 6 words)
-- appeal       : why this would attract viewers
-"""
+{script_excerpt}"""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert in YouTube video marketing and thumbnail design."},
-                {"role": "user", "content": prompt}
-            ],
+        response = route("thumbnails", lambda model: client.chat.completions.create(
+            model=model,
+            messages=_messages(THUMBNAILS_SYSTEM_PROMPT, payload),
             max_tokens=1000,
             temperature=0.7,
             response_format={"type": "json_object"}
-        )
+        ), prompt_version=PROMPT_VERSIONS["thumbnails"])
         data = json.loads(response.choices[0].message.content)
         return _extract_list(data)
     except Exception as e:
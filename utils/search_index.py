@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import atexit
+import tempfile
+import sqlite3
+import threading
+
+# Full-text index over stored script versions (SQLite FTS5, stdlib only).
+# Not persisted, like script_versions itself: a kept index would return ids
+# whose versions are gone after a restart. It lives in a private temporary
+# file rather than in memory so it can use WAL mode: one writer connection
+# behind a lock, and a read-only connection per thread, so searches run
+# concurrently and never wait for each other or for indexing.
+MAX_PER_PAGE = 100
+# Matches considered per search, newest first. Ranking, the total and
+# pagination cover only these, so a common word costs the same however
+# many versions contain it.
+MAX_CANDIDATES = 2000
+
+# bm25 column weights: topic, script, parameters
+_RANK = "bm25(versions_fts, 10.0, 1.0, 2.0)"
+
+_write_lock = threading.Lock()
+_writer = None
+_db_path = None
+_local = threading.local()
+
+
+def _remove_db(path):
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+def _get_writer():
+    """Create the index on first use; the caller holds _write_lock."""
+    global _writer, _db_path
+    if _writer is None:
+        fd, path = tempfile.mkstemp(prefix="vidioflow-search-", suffix=".db")
+        os.close(fd)
+        atexit.register(_remove_db, path)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # The index is rebuilt from nothing on restart, so skip the fsyncs.
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS versions (
+                rowid       INTEGER PRIMARY KEY,
+                script_id   TEXT NOT NULL,
+                topic       TEXT NOT NULL,
+                tone        TEXT,
+                template_id TEXT,
+                language    TEXT,
+                timestamp   TEXT,
+                parameters  TEXT
+            );
+            CREATE INDEX IF NOT EXISTS versions_tone ON versions (tone);
+            CREATE INDEX IF NOT EXISTS versions_template ON versions (template_id);
+            CREATE INDEX IF NOT EXISTS versions_language ON versions (language);
+            CREATE INDEX IF NOT EXISTS versions_timestamp ON versions (timestamp);
+            -- Contentless: the script text already lives in script_versions,
+            -- the index only needs the postings.
+            CREATE VIRTUAL TABLE IF NOT EXISTS versions_fts USING fts5(
+                topic, script, parameters,
+                content='', tokenize='unicode61 remove_diacritics 2', prefix='3'
+            );
+        """)
+        _writer, _db_path = conn, path
+    return _writer
+
+
+def _get_reader():
+    """This thread's read-only connection, or None if nothing is indexed yet."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if _db_path is None:
+            return None
+        conn = sqlite3.connect(f"file:{_db_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
+    return conn
+
+
+def _match_expression(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match as a whole
+    word, except the last one, which also matches as a prefix when it is at
+    least 3 characters long so partial input still finds results. Short
+    prefixes expand to huge term lists, so they are never used.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    if len(words[-1]) >= 3:
+        terms[-1] += "*"
+    return " AND ".join(terms)
+
+
+def index_script_version(version):
+    """Add a stored script version (as kept in script_versions) to the index."""
+    params = version["parameters"]
+    param_text = " ".join(str(v) for v in params.values() if v is not None)
+    with _write_lock:
+        conn = _get_writer()
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO versions (script_id, topic, tone, template_id, language,"
+                " timestamp, parameters) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (version["id"], params.get("topic", ""), params.get("tone"),
+                 params.get("template_id"), params.get("language"),
+                 version["timestamp"], json.dumps(params))
+            )
+            conn.execute(
+                "INSERT INTO versions_fts (rowid, topic, script, parameters) VALUES (?, ?, ?, ?)",
+                (cur.lastrowid, params.get("topic", ""), version["script"], param_text)
+            )
+
+
+def search_script_versions(query="", tone=None, template_id=None, language=None,
+                           page=1, per_page=20):
+    """
+    Ranked, paginated search over indexed script versions. With an empty
+    query the filtered versions are listed newest first. Only the newest
+    MAX_CANDIDATES matches are ranked and paged through; total_capped says
+    whether there were more.
+
+    Returns:
+        dict: results (id, timestamp, parameters, score), total, total_capped,
+        page, per_page.
+    """
+    page = max(1, int(page))
+    per_page = max(1, min(MAX_PER_PAGE, int(per_page)))
+    offset = (page - 1) * per_page
+
+    filters, args = [], []
+    for column, value in (("tone", tone), ("template_id", template_id), ("language", language)):
+        if value:
+            filters.append(f"v.{column} = ?")
+            args.append(value)
+
+    match = _match_expression(query or "")
+    if match:
+        # CROSS JOIN pins versions_fts as the outer loop. Otherwise SQLite may
+        # drive the join from a filter index and re-run MATCH for every row.
+        # FTS5 walks its postings newest rowid first, so the scan stops after
+        # MAX_CANDIDATES matches instead of scoring every one.
+        source = "versions_fts CROSS JOIN versions v ON v.rowid = versions_fts.rowid"
+        filters.insert(0, "versions_fts MATCH ?")
+        args.insert(0, match)
+        score, order = _RANK, "versions_fts.rowid DESC"
+    else:
+        source = "versions v"
+        score, order = "0.0", "v.timestamp DESC, v.rowid DESC"
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    conn = _get_reader()
+    if conn is None:
+        candidates, rows, total_capped = [], [], False
+    else:
+        candidates = conn.execute(
+            f"SELECT v.rowid, {score} AS score FROM {source} {where}"
+            f" ORDER BY {order} LIMIT ?",
+            args + [MAX_CANDIDATES + 1]
+        ).fetchall()
+        total_capped = len(candidates) > MAX_CANDIDATES
+        candidates = candidates[:MAX_CANDIDATES]
+        # Stable sort: equal scores stay newest first.
+        ranked = sorted(candidates, key=lambda c: c["score"])[offset:offset + per_page]
+        page_ids = [c["rowid"] for c in ranked]
+        by_id = {}
+        if page_ids:
+            by_id = {row["rowid"]: row for row in conn.execute(
+                "SELECT rowid, script_id, timestamp, parameters FROM versions"
+                f" WHERE rowid IN ({', '.join('?' * len(page_ids))})", page_ids
+            )}
+        rows = [(by_id[c["rowid"]], c["score"]) for c in ranked]
+
+    return {
+        "results": [{
+            "id": row["script_id"],
+            "timestamp": row["timestamp"],
+            "parameters": json.loads(row["parameters"]),
+            # bm25 is lower-is-better; flip it so higher means more relevant
+            "score": -score
+        } for row, score in rows],
+        "total": len(candidates),
+        "total_capped": total_capped,
+        "page": page,
+        "per_page": per_page
+    }
@@ -0,0 +1,112 @@
+import re
+import random
+import hashlib
+import threading
+
+STOPWORDS = {
+    "a", "an", "the", "on", "of", "for", "to", "in", "and", "or", "with",
+    "about", "how", "what", "why", "is", "are", "your", "my", "vs", "by"
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Newest ids kept per LSH bucket, so very common topics don't make lookups
+# scan their whole history.
+MAX_BUCKET_SIZE = 64
+
+
+def _normalize_tokens(text):
+    """Lowercase words without stopwords, with a crude plural strip."""
+    tokens = []
+    for word in re.findall(r"\w+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def topic_features(topic):
+    """
+    Shingles for a topic: its normalized words (order-insensitive, so
+    reworded topics match) plus character trigrams of each word (so small
+    spelling differences still overlap).
+    """
+    features = set()
+    for token in _normalize_tokens(topic):
+        features.add("w:" + token)
+        padded = f"^{token}$"
+        features.update("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(features)
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class TopicSimilarityIndex:
+    """
+    In-process MinHash/LSH index over topics, partitioned by a parameters key.
+
+    A lookup hashes the query once and only compares it against topics that
+    share an LSH band bucket, so cost does not grow with history size.
+    Candidates are then verified with exact Jaccard similarity.
+    """
+
+    def __init__(self, num_perm=32, bands=8, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands.")
+        rng = random.Random(seed)
+        self.rows = num_perm // bands
+        self.bands = bands
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self._lock = threading.Lock()
+        self._buckets = {}   # (params key, band, band signature) -> [item ids]
+        self._items = {}     # item id -> (features, insertion order)
+        self._counter = 0
+
+    def _band_keys(self, features, params_key):
+        hashes = [_feature_hash(f) for f in features] or [0]
+        signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+        return [(params_key, band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+                for band in range(self.bands)]
+
+    def add(self, item_id, topic, params_key):
+        features = topic_features(topic)
+        band_keys = self._band_keys(features, params_key)
+        with self._lock:
+            self._counter += 1
+            self._items[item_id] = (features, self._counter)
+            for key in band_keys:
+                bucket = self._buckets.setdefault(key, [])
+                bucket.append(item_id)
+                if len(bucket) > MAX_BUCKET_SIZE:
+                    del bucket[0]
+
+    def query(self, topic, params_key, threshold=0.8):
+        """
+        Return (item id, similarity) of the most similar indexed topic with
+        the same parameters key and similarity >= threshold, preferring the
+        most recent on ties, or None.
+        """
+        features = topic_features(topic)
+        if not features:
+            return None
+        band_keys = self._band_keys(features, params_key)
+
+        best = None
+        with self._lock:
+            candidates = set()
+            for key in band_keys:
+                candidates.update(self._buckets.get(key, ()))
+            for item_id in candidates:
+                item_features, order = self._items[item_id]
+                similarity = len(features & item_features) / len(features | item_features)
+                if similarity >= threshold and (best is None or (similarity, order) > best[:2]):
+                    best = (similarity, order, item_id)
+
+        if best is None:
+            return None
+        return best[2], best[0]
@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+
+class SkippedError(Exception):
+    """Raised inside a speculative job that yielded to interactive traffic."""
+
+
+class SpeculativeCache:
+    """
+    Background precompute of follow-up artifacts for a freshly stored script.
+
+    Jobs run on a small dedicated pool so they never take a request thread.
+    Each job must take a free slot on `gate` (the LLM admission gate) when it
+    starts, so background work stays within the same upstream concurrency
+    limit and is skipped when no slot is free or requests are queueing for
+    one. At most `max_entries` results or in-flight jobs are kept;
+    the oldest are cancelled and dropped beyond that. Scheduling a new
+    version for a topic cancels the work queued for the previous one.
+    """
+
+    def __init__(self, gate, max_workers=2, max_entries=96):
+        self.max_entries = max_entries
+        self.gate = gate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="speculative")
+        self._lock = threading.Lock()
+        self._futures = OrderedDict()   # (kind, script hash, topic) -> Future
+        self._topic_keys = {}           # topic -> keys scheduled for it
+        self._stats = {"scheduled": 0, "hits": 0, "attached": 0,
+                       "misses": 0, "cancelled": 0, "skipped": 0}
+
+    @staticmethod
+    def _key(kind, script, topic=None):
+        return (kind, hashlib.sha256(script.encode("utf-8")).hexdigest(), topic)
+
+    def _run(self, job):
+        if not self.gate.try_acquire():
+            with self._lock:
+                self._stats["skipped"] += 1
+            raise SkippedError()
+        try:
+            return job()
+        finally:
+            self.gate.release()
+
+    def _cancel(self, key):
+        future = self._futures.pop(key, None)
+        if future is not None and future.cancel():
+            self._stats["cancelled"] += 1
+
+    def schedule(self, topic, script, jobs):
+        """
+        Queue jobs for a new script version of `topic`.
+
+        Args:
+            jobs: dict of kind -> (zero-argument callable, topic-or-None the
+                  result depends on besides the script).
+        """
+        with self._lock:
+            for key in self._topic_keys.pop(topic, []):
+                self._cancel(key)
+
+            keys = []
+            for kind, (job, job_topic) in jobs.items():
+                key = self._key(kind, script, job_topic)
+                if key in self._futures:
+                    continue
+                self._futures[key] = self._executor.submit(self._run, job)
+                self._stats["scheduled"] += 1
+                keys.append(key)
+            self._topic_keys[topic] = keys
+
+            while len(self._futures) > self.max_entries:
+                self._cancel(next(iter(self._futures)))
+
+    def invalidate(self, topic):
+        """Cancel anything queued for an older version of `topic`."""
+        with self._lock:
+            for key in self._topic_keys.pop(topic, []):
+                self._cancel(key)
+
+    def get(self, kind, script, compute, topic=None):
+        """
+        Return the precomputed result if there is one, wait for it if it is
+        already running, and otherwise fall back to compute(). A job still
+        queued behind others is cancelled rather than waited for, since
+        computing inline is faster than waiting out the backlog.
+        """
+        key = self._key(kind, script, topic)
+        with self._lock:
+            future = self._futures.get(key)
+            done = future is not None and future.done()
+            if future is not None and not done and future.cancel():
+                del self._futures[key]
+                self._stats["cancelled"] += 1
+                future = None
+
+        if future is not None:
+            try:
+                result = future.result()
+            except (CancelledError, Exception):
+                pass
+            else:
+                with self._lock:
+                    self._stats["hits" if done else "attached"] += 1
+                return result
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return compute()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, tracked=len(self._futures))
+        served = stats["hits"] + stats["attached"]
+        requests = served + stats["misses"]
+        stats["hit_rate"] = served / requests if requests else 0.0
+        return stats
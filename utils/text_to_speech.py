@@ -1,13 +1,30 @@
 import os
 import io
 import re
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
+from utils.model_router import route, get_models
 
 load_dotenv()
 
 VALID_VOICES = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
 
+# Synthesized sections are cached on disk by hash of (model, voice, text), so
+# re-narrating an edited script only calls the API for sections that changed.
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR",
+                          os.path.join(tempfile.gettempdir(), "vidioflow-tts-cache"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+# Smaller sections mean an edit invalidates less audio.
+TTS_SECTION_MAX_LENGTH = 1000
+TTS_MAX_WORKERS = 4
+
+_cache_lock = threading.Lock()
+_cache_bytes = None
+
 
 def _get_client():
     api_key = os.getenv("OPENAI_API_KEY")
@@ -16,10 +33,155 @@ def _get_client():
     return OpenAI(api_key=api_key)
 
 
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def _split_long(text, max_length):
+    """
+    Split text into pieces of at most max_length characters, breaking at
+    sentence ends where possible, then at spaces, and only as a last resort
+    mid-word. extract_speech_sections never splits a single line, so one
+    long line would otherwise exceed the TTS input limit.
+    """
+    if len(text) <= max_length:
+        return [text]
+
+    pieces = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        while len(sentence) > max_length:
+            cut = sentence.rfind(" ", 0, max_length + 1)
+            if cut <= 0:
+                cut = max_length
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_length:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _cache_path(model, voice, text):
+    key = hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, key + ".mp3")
+
+
+def _cache_get(voice, text):
+    """Return cached audio for the section from any configured TTS model."""
+    for model in get_models("tts"):
+        path = _cache_path(model, voice, text)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except OSError:
+            continue
+        try:
+            # mtime doubles as the LRU timestamp
+            os.utime(path)
+        except OSError:
+            pass
+        return audio
+    return None
+
+
+def _cache_put(model, voice, text, audio):
+    global _cache_bytes
+    path = _cache_path(model, voice, text)
+    try:
+        os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=TTS_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+    except OSError:
+        # The cache is an optimization; a read-only or full disk is not an error.
+        return
+
+    with _cache_lock:
+        # Two requests can synthesize the same section concurrently; only the
+        # size change of an overwritten file counts towards the budget.
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _cache_entries())
+        else:
+            _cache_bytes += len(audio) - previous
+        if _cache_bytes > TTS_CACHE_MAX_BYTES:
+            _evict()
+
+
+def _cache_entries():
+    entries = []
+    for name in os.listdir(TTS_CACHE_DIR):
+        if not name.endswith(".mp3"):
+            continue
+        path = os.path.join(TTS_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def _evict():
+    """Delete least recently used files until the cache fits its byte budget."""
+    global _cache_bytes
+    entries = sorted(_cache_entries(), key=lambda e: e[2])
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in entries:
+        if total <= TTS_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    _cache_bytes = total
+
+
+def _synthesize(client, text, voice):
+    response = route("tts", lambda model: (model, client.audio.speech.create(
+        model=model,
+        voice=voice,
+        input=text
+    )))
+    model, speech = response
+    # response.content holds the full audio bytes in the current SDK
+    audio = speech.content
+    _cache_put(model, voice, text, audio)
+    return audio
+
+
 def generate_speech(text, voice="alloy"):
     """
     Generate speech from text using OpenAI's TTS API.
 
+    The text is split into sections (without stripping stage directions,
+    since it may be arbitrary text) and each section is synthesized
+    separately. Sections already in the on-disk cache are reused
+    and only the rest hit the API; the MP3 segments are spliced in order.
+
     Args:
         text (str): The text to convert to speech.
         voice (str): alloy | echo | fable | onyx | nova | shimmer
@@ -27,37 +189,44 @@ def generate_speech(text, voice="alloy"):
     Returns:
         io.BytesIO: Buffer containing MP3 audio data.
     """
-    # OpenAI TTS limit is 4096 characters
-    if len(text) > 4096:
-        text = text[:4093] + "..."
-
     if voice not in VALID_VOICES:
         voice = "alloy"
 
-    client = _get_client()
+    sections = [_normalize(s) for s in
+                extract_speech_sections(text, TTS_SECTION_MAX_LENGTH, strip_directions=False)]
+    sections = [s for s in sections if s] or [_normalize(text)]
+    sections = [piece for s in sections for piece in _split_long(s, TTS_SECTION_MAX_LENGTH)]
+
+    audio = [_cache_get(voice, section) for section in sections]
+    missing = [i for i, segment in enumerate(audio) if segment is None]
 
     try:
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice=voice,
-            input=text
-        )
+        if missing:
+            client = _get_client()
+            with ThreadPoolExecutor(max_workers=min(TTS_MAX_WORKERS, len(missing))) as pool:
+                futures = {i: pool.submit(_synthesize, client, sections[i], voice) for i in missing}
+                for i, future in futures.items():
+                    audio[i] = future.result()
 
         buffer = io.BytesIO()
-        # response.content holds the full audio bytes in the current SDK
-        buffer.write(response.content)
+        for segment in audio:
+            buffer.write(segment)
         buffer.seek(0)
         return buffer
     except Exception as e:
         raise Exception(f"Error generating speech: {str(e)}")
 
 
-def extract_speech_sections(script, max_length=4000):
+def extract_speech_sections(script, max_length=4000, strip_directions=True):
     """
-    Break a long script into TTS-friendly sections, stripping stage directions.
+    Break a long script into TTS-friendly sections. Headings start a new
+    section; a line that is only a heading is dropped, while text following
+    "HEADING:" on the same line is kept. With strip_directions, [VISUAL ...]
+    and [CAPTION ...] lines are removed as well.
 
     Returns:
-        list[str]: Clean text sections each under max_length characters.
+        list[str]: Text sections; a single line longer than max_length is
+        kept whole.
     """
     lines = script.split('\n')
     sections = []
@@ -65,13 +234,14 @@ def extract_speech_sections(script, max_length=4000):
 
     for line in lines:
         # Strip visual/caption stage directions
-        if "[VISUAL" in line or "[CAPTION" in line:
+        if strip_directions and ("[VISUAL" in line or "[CAPTION" in line):
             continue
-        # Skip section headers
-        if re.match(r'^[A-Z\s]+:', line) or line.startswith('#'):
+        # Section headers start a new section; only the heading itself is dropped
+        heading = re.match(r'^[A-Z\s]+:', line)
+        if heading or line.startswith('#'):
             if current_section.strip():
                 sections.append(current_section.strip())
-            current_section = ""
+            current_section = line[heading.end():].strip() if heading else ""
             continue
 
         if len(current_section) + len(line) + 1 > max_length: